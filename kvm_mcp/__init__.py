@@ -2,7 +2,7 @@ from .server import main
 from .config.config import config
 from .connection.pool import connection_pool
 from .cache.vm_cache import vm_info_cache
-from .vm.management import list_vms, start_vm, stop_vm, reboot_vm, get_vm_ip
+from .vm.management import list_vms, start_vm, stop_vm, reboot_vm, get_vnc_ports, get_vm_ip
 
 __all__ = [
     'main',
@@ -13,5 +13,6 @@ __all__ = [
     'start_vm',
     'stop_vm',
     'reboot_vm',
+    'get_vnc_ports',
     'get_vm_ip'
 ]
@@ -1,47 +1,102 @@
 import time
 import logging
+import threading
+from collections import Counter, OrderedDict
+from itertools import islice
 
 logger = logging.getLogger('kvm_mcp')
 
 class VMInfoCache:
-    """A simple LRU cache for VM information."""
-    
+    """An LRU cache for VM information with O(1) get/set/evict.
+
+    Eviction is frequency-aware (TinyLFU-style): the victim is the least
+    frequently used entry among a small sample of the least recently used
+    ones, so hot keys like the cached VM list survive bursts of one-off
+    lookups.
+    """
+
+    # How many LRU-end entries to sample when picking an eviction victim
+    EVICTION_SAMPLE_SIZE = 5
+    # Halve all frequency counts after this many accesses, so stale
+    # popularity ages out
+    AGING_INTERVAL = 1000
+
     def __init__(self, max_size=50, ttl=60):
         self.max_size = max_size
         self.ttl = ttl
-        self.cache = {}
-        self.timestamps = {}
-    
+        # Maps vm_name -> (insert_time, vm_info); ordered oldest-access first
+        self.cache = OrderedDict()
+        # Access frequency per key, aged periodically
+        self.freq = Counter()
+        self._accesses = 0
+        # Operations never await, so a plain lock keeps the OrderedDict
+        # consistent across coroutines and executor threads alike
+        self._lock = threading.Lock()
+
+    def _record_access(self, vm_name):
+        """Bump a key's frequency, halving all counts periodically."""
+        self.freq[vm_name] += 1
+        self._accesses += 1
+        if self._accesses >= self.AGING_INTERVAL:
+            self._accesses = 0
+            self.freq = Counter({k: v >> 1 for k, v in self.freq.items() if v > 1})
+
     def get(self, vm_name):
         """Get a VM's info from the cache if available and not expired."""
-        if vm_name in self.cache:
-            if time.time() - self.timestamps[vm_name] < self.ttl:
-                return self.cache[vm_name]
+        with self._lock:
+            entry = self.cache.get(vm_name)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] < self.ttl:
+                # Mark as most recently used
+                self.cache.move_to_end(vm_name)
+                self._record_access(vm_name)
+                return entry[1]
             # Expired
             del self.cache[vm_name]
-            del self.timestamps[vm_name]
-        return None
-    
+            return None
+
     def set(self, vm_name, vm_info):
         """Set a VM's info in the cache."""
-        # Remove oldest item if full
-        if len(self.cache) >= self.max_size:
-            oldest_vm = min(self.timestamps.items(), key=lambda x: x[1])[0]
-            del self.cache[oldest_vm]
-            del self.timestamps[oldest_vm]
-        
-        self.cache[vm_name] = vm_info
-        self.timestamps[vm_name] = time.time()
-    
+        with self._lock:
+            if vm_name in self.cache:
+                self.cache.move_to_end(vm_name)
+            elif len(self.cache) >= self.max_size:
+                self._evict_one()
+
+            self.cache[vm_name] = (time.monotonic(), vm_info)
+
+    def _evict_one(self):
+        """Evict the least frequently used of the oldest few entries."""
+        sample = list(islice(self.cache, self.EVICTION_SAMPLE_SIZE))
+        victim = min(sample, key=lambda k: self.freq[k])
+        del self.cache[victim]
+        self.freq.pop(victim, None)
+
+    def patch(self, key, match_fn, update_fn):
+        """Update matching items of a cached list in place, keeping its age.
+
+        Returns True when the key held a list and was patched; callers
+        fall back to invalidate() on False.
+        """
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None or not isinstance(entry[1], list):
+                return False
+            for item in entry[1]:
+                if match_fn(item):
+                    update_fn(item)
+            return True
+
     def invalidate(self, vm_name=None):
         """Invalidate cache entry for a VM or the entire cache."""
-        if vm_name:
-            if vm_name in self.cache:
-                del self.cache[vm_name]
-                del self.timestamps[vm_name]
-        else:
-            self.cache.clear()
-            self.timestamps.clear()
+        with self._lock:
+            if vm_name:
+                self.cache.pop(vm_name, None)
+                self.freq.pop(vm_name, None)
+            else:
+                self.cache.clear()
+                self.freq.clear()
 
 # Create a global VM info cache instance
-vm_info_cache = VMInfoCache() 
\ No newline at end of file
+vm_info_cache = VMInfoCache()
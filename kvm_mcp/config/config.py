@@ -1,56 +1,89 @@
 import os
+import copy
 import json
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger('kvm_mcp')
 
-def _apply_env_overrides(config: dict, prefix: str = "") -> dict:
-    """Apply environment variable overrides to configuration"""
+def _convert_env_value(current, env_value):
+    """Convert an environment string to the type of the current value.
+
+    Returns the converted value, or the current value when conversion is
+    not possible (invalid bool/int/float strings keep the original).
+    """
+    if env_value == "":  # Handle empty strings
+        return "" if isinstance(current, str) else current
+    try:
+        if isinstance(current, bool):
+            # For bool values, only accept specific true/false values
+            if env_value.lower() in ("true", "1", "yes", "on"):
+                return True
+            if env_value.lower() in ("false", "0", "no", "off"):
+                return False
+            return current  # Keep original value for invalid bool
+        if isinstance(current, int):
+            return int(env_value)
+        if isinstance(current, float):
+            return float(env_value)
+        return env_value
+    except (ValueError, TypeError):
+        # Keep original value if conversion fails
+        return current
+
+def _flatten_leaves(config, prefix=""):
+    """Yield (env_key, parent_dict, key) for every leaf in the config."""
     for key, value in config.items():
         env_key = f"{prefix}{key}".upper()
         if isinstance(value, dict):
-            config[key] = _apply_env_overrides(value, f"{env_key}_")
+            yield from _flatten_leaves(value, f"{env_key}_")
         else:
-            if env_key in os.environ:
-                env_value = os.environ[env_key]
-                if env_value == "":  # Handle empty strings
-                    if isinstance(value, str):
-                        config[key] = ""
-                    continue
-                try:
-                    if isinstance(value, bool):
-                        # For bool values, only accept specific true/false values
-                        if env_value.lower() in ("true", "1", "yes", "on"):
-                            config[key] = True
-                        elif env_value.lower() in ("false", "0", "no", "off"):
-                            config[key] = False
-                        else:
-                            continue  # Keep original value for invalid bool
-                    elif isinstance(value, int):
-                        config[key] = int(env_value)
-                    elif isinstance(value, float):
-                        config[key] = float(env_value)
-                    else:
-                        config[key] = env_value
-                except (ValueError, TypeError):
-                    # Keep original value if conversion fails
-                    continue
+            yield env_key, config, key
+
+def _apply_env_overrides(config: dict, prefix: str = "") -> dict:
+    """Apply environment variable overrides to configuration"""
+    # Flatten the tree once into an index, then scan os.environ in a
+    # single pass: O(leaves + environ) instead of per-leaf env-key
+    # derivation and lookups
+    leaf_index = {env_key: (parent, key)
+                  for env_key, parent, key in _flatten_leaves(config, prefix)}
+    for env_key, env_value in os.environ.items():
+        target = leaf_index.get(env_key)
+        if target is not None:
+            parent, key = target
+            parent[key] = _convert_env_value(parent[key], env_value)
     return config
 
+@lru_cache(maxsize=4)
+def _parse_config_file(config_path, mtime):
+    """Parse config.json, memoized on (path, mtime).
+
+    A changed file gets a new mtime and therefore a fresh parse; repeated
+    loads of an unchanged file are O(1).
+    """
+    with open(config_path) as f:
+        return json.load(f)
+
 def load_config():
     """Load configuration from config.json and apply environment variable overrides"""
     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
     try:
-        with open(config_path) as f:
-            config = json.load(f)
+        mtime = os.path.getmtime(config_path)
+    except OSError:
+        mtime = None
+    try:
+        parsed = _parse_config_file(config_path, mtime)
     except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file not found at {config_path}")
     except json.JSONDecodeError as e:
         raise json.JSONDecodeError(f"Invalid JSON in configuration file: {str(e)}", e.doc, e.pos)
-    
-    # Apply environment variable overrides
+
+    # Overrides mutate the tree, so give each caller its own copy rather
+    # than leaking the cached parse
+    config = copy.deepcopy(parsed)
     _apply_env_overrides(config, prefix="")
     return config
 
-# Load and store the configuration
-config = load_config() 
\ No newline at end of file
+# Load and store the configuration once; importers share this parsed copy
+# instead of re-reading config.json
+config = load_config()
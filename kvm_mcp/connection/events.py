@@ -0,0 +1,39 @@
+import asyncio
+import libvirt
+import logging
+import threading
+
+logger = logging.getLogger('kvm_mcp')
+
+_event_loop_started = False
+
+def _run_event_loop():
+    while True:
+        libvirt.virEventRunDefaultImpl()
+
+def start_event_loop():
+    """Run libvirt's default event loop in a daemon thread.
+
+    Must be called before opening connections that want keepalive or
+    event callbacks. Safe to call more than once.
+    """
+    global _event_loop_started
+    if _event_loop_started:
+        return
+    libvirt.virEventRegisterDefaultImpl()
+    threading.Thread(target=_run_event_loop, name="libvirt-events", daemon=True).start()
+    _event_loop_started = True
+    logger.debug("libvirt event loop started")
+
+async def watch_domain_lifecycle(uri, callback):
+    """Subscribe to domain lifecycle events on a dedicated connection.
+
+    The callback runs on the event-loop thread with the standard
+    (conn, domain, event, detail, opaque) signature. Returns the
+    connection so the caller can keep it (and the subscription) alive.
+    """
+    conn = await asyncio.to_thread(libvirt.open, uri)
+    if not conn:
+        raise libvirt.libvirtError("Failed to open event connection")
+    conn.domainEventRegisterAny(None, libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE, callback, None)
+    return conn
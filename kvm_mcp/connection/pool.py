@@ -1,93 +1,208 @@
 import libvirt
 import asyncio
+import time
 import logging
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
 logger = logging.getLogger('kvm_mcp')
 
+@dataclass
+class PooledConn:
+    """A pooled libvirt connection with liveness bookkeeping."""
+    conn: object
+    last_checked: float
+    use_count: int = 0
+    dead: bool = False
+
 class LibvirtConnectionPool:
     """A simple connection pool for libvirt to avoid repeated connections."""
-    
+
+    # Probe a returned connection only after this much idle time...
+    LIVENESS_CHECK_INTERVAL = 30
+    # ...or every this many uses, whichever comes first
+    LIVENESS_CHECK_USES = 64
+
     def __init__(self, uri='qemu:///system', max_connections=5, timeout=30):
         self.uri = uri
         self.max_connections = max_connections
         self.timeout = timeout
-        self.connections = asyncio.Queue(maxsize=max_connections)
+        # LIFO so the most recently used connection is handed out next;
+        # the longest-idle one is the most likely to have been reaped by
+        # libvirtd's idle timeout
+        self.connections = asyncio.LifoQueue(maxsize=max_connections)
         self.active_connections = 0
-        self._initialize()
-    
-    def _initialize(self):
-        """Initialize the connection pool with connections."""
-        for _ in range(self.max_connections):
-            try:
-                conn = libvirt.open(self.uri)
-                if conn:
-                    self.connections.put_nowait(conn)
-                    self.active_connections += 1
-                    logger.debug(f"Added connection to pool, active: {self.active_connections}")
-            except libvirt.libvirtError as e:
-                logger.error(f"Failed to initialize libvirt connection: {str(e)}")
+        # In-flight return/replace tasks, awaited by close_all
+        self._maintenance = set()
+
+    def _register(self, conn):
+        """Wrap a fresh connection and enable keepalive on it.
+
+        Counting the connection toward the pool is the caller's job, so
+        the overflow and replacement paths can reuse this without
+        double-counting.
+        """
+        try:
+            # Let libvirtd reap dead peers; effective once the libvirt
+            # event loop is running
+            conn.setKeepAlive(5, 3)
+        except libvirt.libvirtError:
+            logger.debug("Keepalive not available for this connection")
+        return PooledConn(conn, last_checked=time.monotonic())
+
+    async def initialize(self):
+        """Warm the connection pool, opening connections in parallel.
+
+        libvirt.open is a blocking C call, so the opens run in threads
+        concurrently: warm-up costs one connection setup, not
+        max_connections of them. Called once from main() before serving.
+        """
+        results = await asyncio.gather(
+            *(asyncio.to_thread(libvirt.open, self.uri) for _ in range(self.max_connections)),
+            return_exceptions=True
+        )
+        for conn in results:
+            if isinstance(conn, Exception):
+                logger.error("Failed to initialize libvirt connection: %s", conn)
                 # Don't raise - allow partial pool initialization
-    
+            elif conn:
+                self.connections.put_nowait(self._register(conn))
+                self.active_connections += 1
+                logger.debug("Added connection to pool, active: %d", self.active_connections)
+
+    def _needs_liveness_check(self, pooled):
+        """Decide whether a returned connection warrants a real probe."""
+        return (time.monotonic() - pooled.last_checked > self.LIVENESS_CHECK_INTERVAL
+                or pooled.use_count % self.LIVENESS_CHECK_USES == 0)
+
     @asynccontextmanager
     async def get_connection(self):
         """Get a connection from the pool."""
-        conn = None
+        pooled = None
         try:
-            # Try to get from the pool first
             try:
-                conn = await asyncio.wait_for(self.connections.get(), self.timeout)
-                logger.debug("Got connection from pool")
-                yield conn
-            except asyncio.TimeoutError:
-                # If the pool is empty and we reach max, create a new one
-                logger.warning("Connection pool timeout, creating new connection")
-                conn = libvirt.open(self.uri)
-                if not conn:
-                    raise libvirt.libvirtError("Failed to connect to libvirt daemon")
-                yield conn
-        except libvirt.libvirtError as e:
-            logger.error(f"Libvirt connection error: {str(e)}")
-            raise
-        finally:
-            # Return the connection to the pool if it's still valid
-            if conn:
-                try:
-                    # Simple check if connection is alive
-                    conn.getVersion()
-                    await self.connections.put(conn)
-                    logger.debug("Returned connection to pool")
-                except libvirt.libvirtError:
-                    # Connection is dead, close it
+                # Fast path: grab an available connection without paying
+                # for the Future and timer that wait_for allocates
+                pooled = self.connections.get_nowait()
+                logger.debug("Got connection from pool (fast path)")
+            except asyncio.QueueEmpty:
+                if self.active_connections < self.max_connections:
+                    # Grow the pool lazily instead of waiting out the
+                    # timeout when we're below capacity. Reserve the slot
+                    # before the blocking open so a concurrent burst
+                    # can't overshoot max_connections
+                    self.active_connections += 1
                     try:
-                        conn.close()
+                        conn = await asyncio.to_thread(libvirt.open, self.uri)
+                        if not conn:
+                            raise libvirt.libvirtError("Failed to connect to libvirt daemon")
+                    except BaseException:
                         self.active_connections -= 1
-                        logger.warning(f"Closed dead connection, active: {self.active_connections}")
-                    except:
-                        pass
-                    
-                    # Create a new one if possible
+                        raise
+                    pooled = self._register(conn)
+                    logger.debug("Added connection to pool, active: %d", self.active_connections)
+                else:
                     try:
-                        new_conn = libvirt.open(self.uri)
-                        if new_conn:
-                            await self.connections.put(new_conn)
-                            self.active_connections += 1
-                            logger.debug(f"Created replacement connection, active: {self.active_connections}")
-                    except:
-                        logger.error("Failed to create replacement connection")
+                        pooled = await asyncio.wait_for(self.connections.get(), self.timeout)
+                        logger.debug("Got connection from pool")
+                    except asyncio.TimeoutError:
+                        # If the pool is empty and we reach max, create a new one
+                        logger.warning("Connection pool timeout, creating new connection")
+                        conn = await asyncio.to_thread(libvirt.open, self.uri)
+                        if not conn:
+                            raise libvirt.libvirtError("Failed to connect to libvirt daemon")
+                        pooled = self._register(conn)
+            yield pooled.conn
+        except libvirt.libvirtError as e:
+            # The caller hit a libvirt error; don't trust this connection
+            if pooled:
+                pooled.dead = True
+            logger.error("Libvirt connection error: %s", e)
+            raise
+        finally:
+            if pooled:
+                pooled.use_count += 1
+                # Pool upkeep (probe/return/replace) runs off the caller's
+                # critical path so responses aren't delayed by it
+                task = asyncio.create_task(self._return_or_replace(pooled))
+                self._maintenance.add(task)
+                task.add_done_callback(self._maintenance.discard)
 
-    async def close_all(self):
-        """Close all connections in the pool."""
-        while not self.connections.empty():
+    async def _put_or_discard(self, pooled):
+        """Pool a connection without blocking, closing it when full.
+
+        Overflow connections from the acquire-timeout branch exceed the
+        queue capacity and don't need to be pooled; a blocking put here
+        would wedge the maintenance task (and close_all) forever.
+        """
+        try:
+            self.connections.put_nowait(pooled)
+            return True
+        except asyncio.QueueFull:
+            try:
+                await asyncio.to_thread(pooled.conn.close)
+                logger.debug("Closed overflow connection")
+            except Exception:
+                pass
+            return False
+
+    async def _return_or_replace(self, pooled):
+        """Return a connection to the pool, replacing it when unhealthy."""
+        try:
+            # isAlive is a local socket-state check (no RPC); the
+            # real getVersion probe only runs periodically
+            if pooled.dead:
+                raise libvirt.libvirtError("Connection marked dead")
+            if pooled.conn.isAlive() == 0:
+                raise libvirt.libvirtError("Connection no longer alive")
+            if self._needs_liveness_check(pooled):
+                await asyncio.to_thread(pooled.conn.getVersion)
+                pooled.last_checked = time.monotonic()
+            if await self._put_or_discard(pooled):
+                logger.debug("Returned connection to pool")
+        except libvirt.libvirtError:
+            # Connection is dead, close it
             try:
-                conn = self.connections.get_nowait()
-                conn.close()
+                await asyncio.to_thread(pooled.conn.close)
                 self.active_connections -= 1
-                logger.debug(f"Closed connection, active: {self.active_connections}")
+                logger.warning("Closed dead connection, active: %d", self.active_connections)
+            except:
+                pass
+
+            # Create a new one if possible
+            try:
+                new_conn = await asyncio.to_thread(libvirt.open, self.uri)
+                if new_conn and await self._put_or_discard(self._register(new_conn)):
+                    self.active_connections += 1
+                    logger.debug("Created replacement connection, active: %d", self.active_connections)
+            except:
+                logger.error("Failed to create replacement connection")
+
+    async def close_all(self):
+        """Close all connections in the pool concurrently."""
+        # Let in-flight returns/replacements land first
+        if self._maintenance:
+            await asyncio.gather(*self._maintenance, return_exceptions=True)
+
+        drained = []
+        while True:
+            try:
+                drained.append(self.connections.get_nowait())
             except asyncio.QueueEmpty:
                 break
-            except Exception as e:
-                logger.error(f"Error closing connection: {str(e)}")
+        if not drained:
+            return
+
+        # Shutdown cost is max(close) rather than sum(close)
+        results = await asyncio.gather(
+            *(asyncio.to_thread(pooled.conn.close) for pooled in drained),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Error closing connection: %s", result)
+        self.active_connections -= len(drained)
+        logger.debug("Closed %d connections, active: %d", len(drained), self.active_connections)
 
 # Create a global connection pool instance
-connection_pool = LibvirtConnectionPool() 
\ No newline at end of file
+connection_pool = LibvirtConnectionPool()
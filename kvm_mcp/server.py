@@ -3,28 +3,46 @@ import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 import asyncio
+import libvirt
 import signal
 import sys
 import json
 from datetime import datetime
 
-from .config.config import config
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:  # pragma: no cover - orjson is optional
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+
 from .connection.pool import connection_pool
+from .connection.events import start_event_loop, watch_domain_lifecycle
 from .cache.vm_cache import vm_info_cache
-from .vm.management import list_vms, start_vm, stop_vm, reboot_vm, get_vm_ip
-from .vm.creation import create_vm
+from .vm.management import (list_vms, start_vm, stop_vm, reboot_vm, get_vnc_ports,
+                            forget_domain_handle)
+from .vm.creation import create_vm, create_vms
+
+_COLORS = {
+    "info": "\033[94m",  # Blue
+    "success": "\033[92m",  # Green
+    "warning": "\033[93m",  # Yellow
+    "error": "\033[91m",  # Red
+}
+_RESET = "\033[0m"
 
 def console_print(message: str, message_type: str = "info") -> None:
     """Print a formatted message to the console stderr"""
     timestamp = datetime.now().strftime("%H:%M:%S")
-    color = {
-        "info": "\033[94m",  # Blue
-        "success": "\033[92m",  # Green
-        "warning": "\033[93m",  # Yellow
-        "error": "\033[91m",  # Red
-    }.get(message_type, "\033[0m")  # Default/Reset
-    
-    print(f"{color}[{timestamp}] {message}\033[0m", file=sys.stderr, flush=True)
+    color = _COLORS.get(message_type, _RESET)
+
+    print(f"{color}[{timestamp}] {message}{_RESET}", file=sys.stderr, flush=True)
 
 # Configure logging
 log_dir = os.path.dirname(os.path.abspath(__file__))
@@ -40,39 +58,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger('kvm_mcp')
 
-async def handle_request(request_str: str) -> str:
-    """Handle a JSON-RPC request"""
+# Tool dispatch table; adding a tool is one entry instead of a new branch
+# in handle_request
+TOOLS = {
+    "list_vms": list_vms,
+    "start_vm": start_vm,
+    "stop_vm": stop_vm,
+    "reboot_vm": reboot_vm,
+    "get_vnc_ports": get_vnc_ports,
+    "create_vm": create_vm,
+    "create_vms": create_vms,
+}
+
+# Only the request id varies in the initialize reply; share the result
+# payload across calls (it is serialized, never mutated)
+_INIT_RESULT = {
+    "protocolVersion": "1.0",
+    "serverInfo": {
+        "name": "kvm-control"
+    }
+}
+
+async def handle_request(request_str) -> bytes:
+    """Handle a JSON-RPC request (str or bytes) and return response bytes"""
+    request = None
     try:
-        request = json.loads(request_str)
+        request = _json_loads(request_str)
         
         if request["method"] == "initialize":
             response = {
                 "jsonrpc": "2.0",
                 "id": request["id"],
-                "result": {
-                    "protocolVersion": "1.0",
-                    "serverInfo": {
-                        "name": "kvm-control"
-                    }
-                }
+                "result": _INIT_RESULT
             }
         elif request["method"] == "tools/call":
             tool_name = request["params"]["name"]
             arguments = request["params"]["arguments"]
-            
-            if tool_name == "list_vms":
-                result = await list_vms(**arguments)
-            elif tool_name == "start_vm":
-                result = await start_vm(**arguments)
-            elif tool_name == "stop_vm":
-                result = await stop_vm(**arguments)
-            elif tool_name == "reboot_vm":
-                result = await reboot_vm(**arguments)
-            elif tool_name == "create_vm":
-                result = await create_vm(**arguments)
-            else:
+
+            tool = TOOLS.get(tool_name)
+            if tool is None:
                 raise ValueError(f"Unknown tool: {tool_name}")
-            
+            result = await tool(**arguments)
+
             response = {
                 "jsonrpc": "2.0",
                 "id": request["id"],
@@ -81,17 +108,31 @@ async def handle_request(request_str: str) -> str:
         else:
             raise ValueError(f"Unknown method: {request['method']}")
         
-        return json.dumps(response)
+        return _json_dumps(response)
     except Exception as e:
         error_response = {
             "jsonrpc": "2.0",
-            "id": request.get("id", None),
+            # The parse may have failed or produced a non-object, in
+            # which case there is no id to echo back
+            "id": request.get("id") if isinstance(request, dict) else None,
             "error": {
                 "code": -32603,
                 "message": str(e)
             }
         }
-        return json.dumps(error_response)
+        return _json_dumps(error_response)
+
+def _on_domain_lifecycle(conn, domain, event, detail, opaque):
+    """Drop cached info for a domain whose state just changed.
+
+    Runs on the libvirt event thread; the cache is lock-protected.
+    """
+    name = domain.name()
+    vm_info_cache.invalidate(name)
+    vm_info_cache.invalidate("_all_vms_")
+    vm_info_cache.invalidate("_vnc_ports_")
+    if event in (libvirt.VIR_DOMAIN_EVENT_DEFINED, libvirt.VIR_DOMAIN_EVENT_UNDEFINED):
+        forget_domain_handle(name)
 
 async def shutdown(sig_name=None):
     """Clean shutdown of the server"""
@@ -121,24 +162,81 @@ async def main():
             lambda s=sig: asyncio.create_task(shutdown(sig.name))
         )
     
+    # Run libvirt's event loop so keepalive works and domain lifecycle
+    # transitions invalidate the VM cache as they happen, then open the
+    # libvirt connections off the event loop before serving
+    event_conn = None
+    try:
+        start_event_loop()
+    except Exception as e:
+        console_print(f'libvirt event loop unavailable: {str(e)}', "warning")
+    await connection_pool.initialize()
+    try:
+        # Keep a reference so the subscription stays alive
+        event_conn = await watch_domain_lifecycle(connection_pool.uri, _on_domain_lifecycle)
+    except Exception as e:
+        console_print(f'Domain lifecycle events unavailable: {str(e)}', "warning")
+
     console_print("KVM MCP Server starting...", "info")
     console_print("Waiting for JSON-RPC requests...", "info")
     console_print("Press Ctrl+C to stop the server", "info")
     
+    # Wire stdin into an asyncio StreamReader so reads don't tie up
+    # executor threads, and handle requests concurrently
+    reader = asyncio.StreamReader()
+    protocol = asyncio.StreamReaderProtocol(reader)
+    await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+
+    write_lock = asyncio.Lock()
+    pending = set()
+    out = sys.stdout.buffer
+
+    async def handle_and_write(request_str: bytes):
+        try:
+            response = await handle_request(request_str)
+        except Exception as e:
+            # A dispatched task that dies would otherwise vanish without
+            # a trace and leave the client waiting forever
+            logger.exception("Unhandled error while handling request")
+            response = _json_dumps({
+                "jsonrpc": "2.0",
+                "id": None,
+                "error": {
+                    "code": -32603,
+                    "message": str(e)
+                }
+            })
+        # Serialize writes so concurrent responses don't interleave; one
+        # binary write per response skips the text codec and the second
+        # syscall print() pays for the newline
+        async with write_lock:
+            out.write(response + b"\n")
+            out.flush()
+
     try:
         # Read requests from stdin and write responses to stdout
         while True:
-            request = await loop.run_in_executor(None, sys.stdin.readline)
+            request = await reader.readline()
             if not request:
                 break
-                
-            response = await handle_request(request)
-            print(response, flush=True)
+
+            task = asyncio.create_task(handle_and_write(request))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        # Drain in-flight requests before shutting down
+        if pending:
+            await asyncio.gather(*pending)
     except Exception as e:
         console_print(f'Server error: {str(e)}', "error")
         await shutdown()
     finally:
         console_print('Server stopped', "warning")
+        if event_conn:
+            try:
+                await asyncio.to_thread(event_conn.close)
+            except Exception:
+                pass
         # Remove signal handlers
         for sig in (signal.SIGTERM, signal.SIGINT):
-            loop.remove_signal_handler(sig) 
\ No newline at end of file
+            loop.remove_signal_handler(sig)
\ No newline at end of file
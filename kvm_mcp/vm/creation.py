@@ -1,14 +1,53 @@
 import os
+import re
 import json
+import asyncio
 import logging
-import subprocess
 import tempfile
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from .ignition import generate_ignition_config
 
 logger = logging.getLogger('kvm_mcp')
 
+# Characters not allowed in VM names, precompiled so validation runs in C
+_INVALID_NAME_RE = re.compile(r"[!@#$%^&*()+={}\[\]|\\:;\"'<>?/]")
+
+# Scalar argument checks, evaluated in order; the first failing predicate
+# wins so bounds checks can assume the type check before them passed
+_CREATE_VALIDATORS = (
+    ("name",      lambda v: v and isinstance(v, str),       "Invalid VM name"),
+    ("name",      lambda v: not _INVALID_NAME_RE.search(v), "VM name contains invalid characters"),
+    ("memory",    lambda v: isinstance(v, int) and v >= 256, "Memory must be at least 256MB"),
+    ("memory",    lambda v: v <= 1024 * 1024,               "Memory exceeds maximum limit of 1TB"),
+    ("vcpus",     lambda v: isinstance(v, int) and v >= 1,  "Must have at least 1 vCPU"),
+    ("vcpus",     lambda v: v <= 128,                       "vCPUs exceed maximum limit of 128"),
+    ("disk_size", lambda v: isinstance(v, int) and v >= 1,  "Disk size must be at least 1GB"),
+    ("disk_size", lambda v: v <= 10000,                     "Disk size exceeds maximum limit of 10TB"),
+    ("network",   lambda v: v and isinstance(v, str),       "Invalid network name"),
+)
+
+def _validate_create_args(args: Dict) -> Optional[str]:
+    """Return the error message for the first failing check, else None."""
+    for field, predicate, message in _CREATE_VALIDATORS:
+        if not predicate(args.get(field)):
+            return message
+    return None
+
+async def _run_command(cmd: List[str]) -> Tuple[int, str, str]:
+    """Run a command without blocking the event loop.
+
+    virt-install in particular can run for minutes; a blocking
+    subprocess.run here would stall every other request.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    return proc.returncode, stdout.decode(), stderr.decode()
+
 async def create_vm(arguments: dict) -> Dict:
     """Create a new CoreOS VM using virt-install as per Fedora CoreOS documentation"""
     try:
@@ -23,24 +62,15 @@ async def create_vm(arguments: dict) -> Dict:
         os_variant = arguments.get("os_variant", "fedora-coreos-stable")
 
         # Validate parameters
-        if not vm_name or not isinstance(vm_name, str):
-            return {"status": "error", "message": "Invalid VM name"}
-        if any(c in "!@#$%^&*()+={}[]|\\:;\"'<>?/" for c in vm_name):
-            return {"status": "error", "message": "VM name contains invalid characters"}
-        if not isinstance(memory, int) or memory < 256:
-            return {"status": "error", "message": "Memory must be at least 256MB"}
-        if memory > 1024 * 1024:
-            return {"status": "error", "message": "Memory exceeds maximum limit of 1TB"}
-        if not isinstance(vcpus, int) or vcpus < 1:
-            return {"status": "error", "message": "Must have at least 1 vCPU"}
-        if vcpus > 128:
-            return {"status": "error", "message": "vCPUs exceed maximum limit of 128"}
-        if not isinstance(disk_size, int) or disk_size < 1:
-            return {"status": "error", "message": "Disk size must be at least 1GB"}
-        if disk_size > 10000:
-            return {"status": "error", "message": "Disk size exceeds maximum limit of 10TB"}
-        if not network or not isinstance(network, str):
-            return {"status": "error", "message": "Invalid network name"}
+        error = _validate_create_args({
+            "name": vm_name,
+            "memory": memory,
+            "vcpus": vcpus,
+            "disk_size": disk_size,
+            "network": network
+        })
+        if error:
+            return {"status": "error", "message": error}
         if not master_image or not os.path.exists(master_image):
             return {"status": "error", "message": f"Master image {master_image} does not exist"}
         if not ignition or not isinstance(ignition, dict):
@@ -52,11 +82,11 @@ async def create_vm(arguments: dict) -> Dict:
             return {"status": "error", "message": f"Disk image {disk_path} already exists"}
 
         # Create disk image with backing file
-        result = subprocess.run([
+        returncode, _, stderr = await _run_command([
             "qemu-img", "create", "-f", "qcow2", "-F", "qcow2", "-b", master_image, disk_path, f"{disk_size}G"
-        ], capture_output=True, text=True)
-        if result.returncode != 0:
-            return {"status": "error", "message": f"Failed to create disk image: {result.stderr}"}
+        ])
+        if returncode != 0:
+            return {"status": "error", "message": f"Failed to create disk image: {stderr}"}
 
         # Generate and write Ignition config to a temp file
         try:
@@ -67,7 +97,7 @@ async def create_vm(arguments: dict) -> Dict:
 
             # Set SELinux context if needed (Fedora/SELinux hosts)
             try:
-                subprocess.run(["chcon", "--verbose", "--type", "svirt_home_t", ign_path], check=False)
+                await _run_command(["chcon", "--verbose", "--type", "svirt_home_t", ign_path])
             except Exception:
                 pass
 
@@ -87,11 +117,11 @@ async def create_vm(arguments: dict) -> Dict:
             ]
 
             # Run virt-install
-            result = subprocess.run(virtinstall_cmd, capture_output=True, text=True)
-            if result.returncode != 0:
+            returncode, _, stderr = await _run_command(virtinstall_cmd)
+            if returncode != 0:
                 # Clean up temp ignition file
                 os.unlink(ign_path)
-                return {"status": "error", "message": f"virt-install failed: {result.stderr}"}
+                return {"status": "error", "message": f"virt-install failed: {stderr}"}
 
             # Clean up temp ignition file
             os.unlink(ign_path)
@@ -107,4 +137,34 @@ async def create_vm(arguments: dict) -> Dict:
             return {"status": "error", "message": f"Error during VM creation: {str(e)}"}
 
     except Exception as e:
-        return {"status": "error", "message": f"Unexpected error: {str(e)}"} 
\ No newline at end of file
+        return {"status": "error", "message": f"Unexpected error: {str(e)}"}
+
+async def create_vms(specs: List[dict], parallelism: int = 8) -> Dict:
+    """Create several VMs concurrently, bounded by a semaphore.
+
+    Each spec takes the same arguments as create_vm; failures in one
+    spec don't abort the rest.
+    """
+    if not isinstance(specs, list) or not specs:
+        return {"status": "error", "message": "specs must be a non-empty list"}
+    if not isinstance(parallelism, int) or parallelism < 1:
+        return {"status": "error", "message": "parallelism must be a positive integer"}
+
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def _create_one(spec):
+        async with semaphore:
+            return await create_vm(spec)
+
+    results = await asyncio.gather(*(_create_one(spec) for spec in specs),
+                                   return_exceptions=True)
+
+    summary = []
+    for spec, result in zip(specs, results):
+        if isinstance(result, Exception):
+            result = {"status": "error", "message": str(result)}
+        name = spec.get("name") if isinstance(spec, dict) else None
+        summary.append({"name": name, **result})
+
+    status = "success" if all(r["status"] == "success" for r in summary) else "partial"
+    return {"status": status, "results": summary} 
\ No newline at end of file
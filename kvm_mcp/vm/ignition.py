@@ -1,41 +1,36 @@
 import os
 import json
 import logging
+from functools import lru_cache
 
 from ..config.config import config
 
 logger = logging.getLogger('kvm_mcp')
 
-def generate_ignition_config(vm_name: str, arguments: dict) -> str:
-    """Generate an Ignition configuration for Fedora CoreOS"""
-    # Get configuration values
-    hostname = arguments.get("hostname", config["vm"]["ignition"]["default_hostname"])
-    user = arguments.get("user", config["vm"]["ignition"]["default_user"])
-    timezone = arguments.get("timezone", config["vm"]["ignition"]["default_timezone"])
-    locale = arguments.get("locale", config["vm"]["ignition"]["default_locale"])
-    
-    # Validate inputs
-    if not hostname or not user or not timezone or not locale:
-        raise ValueError("Empty values are not allowed for hostname, user, timezone, or locale")
-    
-    # Read SSH key
-    ssh_key_path = os.path.expanduser(arguments.get("ssh_key", config["vm"]["ignition"]["default_ssh_key"]))
-    if not os.path.exists(ssh_key_path):
-        raise FileNotFoundError(f"SSH key not found at {ssh_key_path}")
-    
-    with open(ssh_key_path, 'r') as f:
-        ssh_key = f.read().strip()
-    
-    # Generate Ignition config
-    ignition_config = {
+# Bind the ignition defaults once at import; saves the chained dict
+# lookups on every call when batch-creating VMs
+_IGN_DEFAULTS = config["vm"]["ignition"]
+_DEFAULT_HOSTNAME = _IGN_DEFAULTS["default_hostname"]
+_DEFAULT_USER = _IGN_DEFAULTS["default_user"]
+_DEFAULT_SSH_KEY = _IGN_DEFAULTS["default_ssh_key"]
+_DEFAULT_TIMEZONE = _IGN_DEFAULTS["default_timezone"]
+_DEFAULT_LOCALE = _IGN_DEFAULTS["default_locale"]
+
+def _build_ignition_template() -> str:
+    """Serialize the static Ignition skeleton once at import.
+
+    Only hostname/user/ssh-key/timezone vary between calls, so they are
+    left as placeholder tokens substituted into the pre-rendered JSON.
+    """
+    skeleton = {
         "ignition": {
             "version": "3.3.0"
         },
         "passwd": {
             "users": [
                 {
-                    "name": user,
-                    "sshAuthorizedKeys": [ssh_key]
+                    "name": "__USER__",
+                    "sshAuthorizedKeys": ["__SSH_KEY__"]
                 }
             ]
         },
@@ -46,7 +41,7 @@ def generate_ignition_config(vm_name: str, arguments: dict) -> str:
                     "mode": 420,
                     "overwrite": True,
                     "contents": {
-                        "source": f"data:,{hostname}"
+                        "source": "data:,__HOSTNAME__"
                     }
                 },
                 {
@@ -54,7 +49,7 @@ def generate_ignition_config(vm_name: str, arguments: dict) -> str:
                     "mode": 420,
                     "overwrite": True,
                     "contents": {
-                        "source": f"data:,127.0.0.1   localhost localhost.localdomain localhost4 localhost4.localdomain4\n::1         localhost localhost.localdomain localhost6 localhost6.localdomain6\n127.0.1.1   {hostname} {hostname}.localdomain"
+                        "source": "data:,127.0.0.1   localhost localhost.localdomain localhost4 localhost4.localdomain4\n::1         localhost localhost.localdomain localhost6 localhost6.localdomain6\n127.0.1.1   __HOSTNAME__ __HOSTNAME__.localdomain"
                     }
                 }
             ]
@@ -64,14 +59,14 @@ def generate_ignition_config(vm_name: str, arguments: dict) -> str:
                 {
                     "name": "timezone.service",
                     "enabled": True,
-                    "contents": f"""[Unit]
+                    "contents": """[Unit]
 Description=Set timezone
 After=network-online.target
 Wants=network-online.target
 
 [Service]
 Type=oneshot
-ExecStart=/usr/bin/timedatectl set-timezone {timezone}
+ExecStart=/usr/bin/timedatectl set-timezone __TIMEZONE__
 RemainAfterExit=yes
 
 [Install]
@@ -80,5 +75,60 @@ WantedBy=multi-user.target"""
             ]
         }
     }
-    
-    return json.dumps(ignition_config, indent=2) 
\ No newline at end of file
+    return json.dumps(skeleton, indent=2)
+
+_IGNITION_TEMPLATE = _build_ignition_template()
+
+def _json_escape(value: str) -> str:
+    """Escape a value for splicing into an already-serialized JSON string."""
+    return json.dumps(value)[1:-1]
+
+@lru_cache(maxsize=32)
+def _read_ssh_key_cached(path: str, mtime: float) -> str:
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+@lru_cache(maxsize=256)
+def _render_ignition(hostname: str, user: str, ssh_key: str, timezone: str) -> str:
+    """Fill the template, memoized per distinct argument combination.
+
+    Fleet provisioning typically reuses one hostname/user/key/timezone
+    pattern, so repeat creates return the cached string outright.
+    """
+    return (_IGNITION_TEMPLATE
+            .replace("__HOSTNAME__", _json_escape(hostname))
+            .replace("__USER__", _json_escape(user))
+            .replace("__SSH_KEY__", _json_escape(ssh_key))
+            .replace("__TIMEZONE__", _json_escape(timezone)))
+
+def _read_ssh_key(path: str) -> str:
+    """Read an SSH public key, cached by (path, mtime)."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    return _read_ssh_key_cached(path, mtime)
+
+def generate_ignition_config(vm_name: str, arguments: dict) -> str:
+    """Generate an Ignition configuration for Fedora CoreOS"""
+    # Get configuration values
+    hostname = arguments.get("hostname", _DEFAULT_HOSTNAME)
+    user = arguments.get("user", _DEFAULT_USER)
+    timezone = arguments.get("timezone", _DEFAULT_TIMEZONE)
+    locale = arguments.get("locale", _DEFAULT_LOCALE)
+
+    # Validate inputs
+    if not hostname or not user or not timezone or not locale:
+        raise ValueError("Empty values are not allowed for hostname, user, timezone, or locale")
+
+    # Read SSH key
+    ssh_key_path = os.path.expanduser(arguments.get("ssh_key", _DEFAULT_SSH_KEY))
+    if not os.path.exists(ssh_key_path):
+        raise FileNotFoundError(f"SSH key not found at {ssh_key_path}")
+
+    ssh_key = _read_ssh_key(ssh_key_path)
+
+    # Fill the prebuilt template instead of rebuilding and re-serializing
+    # the whole dict tree per call
+    return _render_ignition(hostname, user, ssh_key, timezone)
@@ -1,7 +1,7 @@
+import asyncio
 import libvirt
 import logging
-import subprocess
-import json
+import xml.etree.ElementTree as ET
 from typing import Dict, Optional
 
 from ..connection.pool import connection_pool
@@ -10,6 +10,126 @@ from ..utils.decorators import timing_decorator
 
 logger = logging.getLogger('kvm_mcp')
 
+# Domain state names indexed by the VIR_DOMAIN_* state constants (0..7)
+_STATE_NAMES = (
+    "no state",   # VIR_DOMAIN_NOSTATE
+    "running",    # VIR_DOMAIN_RUNNING
+    "blocked",    # VIR_DOMAIN_BLOCKED
+    "paused",     # VIR_DOMAIN_PAUSED
+    "shutdown",   # VIR_DOMAIN_SHUTDOWN
+    "shutoff",    # VIR_DOMAIN_SHUTOFF
+    "crashed",    # VIR_DOMAIN_CRASHED
+    "suspended",  # VIR_DOMAIN_PMSUSPENDED
+)
+
+# Domain handles cached by name so repeated actions skip libvirtd's
+# server-side name scan; entries are dropped whenever an action fails
+_domain_handles: Dict[str, object] = {}
+
+def forget_domain_handle(vm_name: str) -> None:
+    """Drop a cached domain handle, e.g. when the domain is redefined."""
+    _domain_handles.pop(vm_name, None)
+
+async def _lookup_domain(conn, vm_name=None, uuid=None):
+    """Resolve a domain by UUID (O(1) server-side) or cached name handle.
+
+    Returns (domain, from_cache); a cached handle may be bound to a
+    connection the pool has since replaced, so callers retry its
+    failures once with a fresh lookup.
+    """
+    if uuid:
+        return await asyncio.to_thread(conn.lookupByUUIDString, uuid), False
+    domain = _domain_handles.get(vm_name)
+    if domain is not None:
+        return domain, True
+    domain = await asyncio.to_thread(conn.lookupByName, vm_name)
+    _domain_handles[vm_name] = domain
+    return domain, False
+
+async def _act_on_domain(conn, vm_name, uuid, action):
+    """Resolve the domain and run action(domain) in a thread.
+
+    When a cached handle fails with anything but OPERATION_INVALID -
+    typically because its underlying connection was replaced - the
+    handle is dropped and the action retried once on a fresh lookup, so
+    pool churn never surfaces as a client-visible error.
+    """
+    domain, from_cache = await _lookup_domain(conn, vm_name, uuid)
+    name = vm_name if vm_name is not None else domain.name()
+    try:
+        await asyncio.to_thread(action, domain)
+    except libvirt.libvirtError as e:
+        if not from_cache or e.get_error_code() == libvirt.VIR_ERR_OPERATION_INVALID:
+            raise
+        _domain_handles.pop(name, None)
+        domain, _ = await _lookup_domain(conn, name)
+        await asyncio.to_thread(action, domain)
+    return name
+
+def _collect_vm_info(conn) -> list:
+    """Collect info for all domains with a constant number of RPCs.
+
+    Domain states come from one bulk getAllDomainStats call, and
+    autostart/persistence from two flag-filtered listAllDomains calls,
+    instead of four round-trips per domain. Runs in a thread since the
+    libvirt calls block.
+    """
+    autostart = {d.name() for d in conn.listAllDomains(libvirt.VIR_CONNECT_LIST_DOMAINS_AUTOSTART)}
+    persistent = {d.name() for d in conn.listAllDomains(libvirt.VIR_CONNECT_LIST_DOMAINS_PERSISTENT)}
+
+    try:
+        # One RPC for every domain's state, memory and vcpu count, with
+        # bulk error handling
+        entries = conn.getAllDomainStats(
+            libvirt.VIR_DOMAIN_STATS_STATE
+            | libvirt.VIR_DOMAIN_STATS_VCPU
+            | libvirt.VIR_DOMAIN_STATS_BALLOON, 0)
+    except libvirt.libvirtError as e:
+        logger.warning(f"getAllDomainStats unavailable, using per-domain state: {str(e)}")
+        return _collect_vm_info_per_domain(conn, autostart, persistent)
+
+    result = [None] * len(entries)
+    for i, (domain, stats) in enumerate(entries):
+        name = domain.name()
+        state = stats.get("state.state", -1)
+        balloon_max = stats.get("balloon.maximum")
+        result[i] = {
+            "name": name,
+            "id": domain.ID(),
+            "uuid": domain.UUIDString(),
+            "state": _STATE_NAMES[state] if 0 <= state < len(_STATE_NAMES) else "unknown",
+            "memory": balloon_max // 1024 if balloon_max else None,  # MiB
+            "vcpus": stats.get("vcpu.maximum"),
+            "autostart": name in autostart,
+            "persistent": name in persistent
+        }
+    return result
+
+def _collect_vm_info_per_domain(conn, autostart, persistent) -> list:
+    """Per-domain fallback for hosts without getAllDomainStats."""
+    result = []
+    for domain in conn.listAllDomains():
+        try:
+            name = domain.name()
+            # info() bundles state, max memory and vcpu count in one RPC
+            state, max_mem, _, nr_vcpu, _ = domain.info()
+            state_str = _STATE_NAMES[state] if 0 <= state < len(_STATE_NAMES) else "unknown"
+
+            vm_info = {
+                "name": name,
+                "id": domain.ID(),
+                "uuid": domain.UUIDString(),
+                "state": state_str,
+                "memory": max_mem // 1024,  # MiB
+                "vcpus": nr_vcpu,
+                "autostart": name in autostart,
+                "persistent": name in persistent
+            }
+            result.append(vm_info)
+        except libvirt.libvirtError as e:
+            logger.error(f"Error getting info for domain {domain.name()}: {str(e)}")
+    return result
+
 @timing_decorator
 async def list_vms(use_cache: bool = True) -> list:
     """List all available virtual machines"""
@@ -18,116 +138,134 @@ async def list_vms(use_cache: bool = True) -> list:
         if cached_list:
             logger.debug("Returning cached VM list")
             return cached_list
-    
+
     logger.info("Fetching VM list from libvirt")
     async with connection_pool.get_connection() as conn:
-        domains = conn.listAllDomains()
-        result = []
-        for domain in domains:
-            try:
-                state, reason = domain.state()
-                state_str = {
-                    libvirt.VIR_DOMAIN_NOSTATE: "no state",
-                    libvirt.VIR_DOMAIN_RUNNING: "running",
-                    libvirt.VIR_DOMAIN_BLOCKED: "blocked",
-                    libvirt.VIR_DOMAIN_PAUSED: "paused",
-                    libvirt.VIR_DOMAIN_SHUTDOWN: "shutdown",
-                    libvirt.VIR_DOMAIN_SHUTOFF: "shutoff",
-                    libvirt.VIR_DOMAIN_CRASHED: "crashed",
-                    libvirt.VIR_DOMAIN_PMSUSPENDED: "suspended"
-                }.get(state, "unknown")
-                
-                vm_info = {
-                    "name": domain.name(),
-                    "id": domain.ID(),
-                    "state": state_str,
-                    "autostart": domain.autostart(),
-                    "persistent": domain.isPersistent()
-                }
-                result.append(vm_info)
-            except libvirt.libvirtError as e:
-                logger.error(f"Error getting info for domain {domain.name()}: {str(e)}")
-    
+        result = await asyncio.to_thread(_collect_vm_info, conn)
+
     if use_cache:
         vm_info_cache.set("_all_vms_", result)
     return result
 
 @timing_decorator
-async def start_vm(vm_name: str) -> Dict:
-    """Start a virtual machine"""
+async def start_vm(vm_name: str = None, uuid: str = None) -> Dict:
+    """Start a virtual machine by name or UUID"""
     async with connection_pool.get_connection() as conn:
         try:
-            domain = conn.lookupByName(vm_name)
-            if domain.isActive():
-                return {"success": False, "error": "VM is already running"}
-            
-            domain.create()
+            # No pre-flight state probe: libvirt refuses an invalid
+            # transition itself, and we translate that error below
+            vm_name = await _act_on_domain(conn, vm_name, uuid, lambda d: d.create())
             vm_info_cache.invalidate(vm_name)
+            # The new domain id (and live memory/vcpu stats) aren't known
+            # without another RPC, so a patched entry would be
+            # inconsistent; refill the list instead. VNC ports changed
+            # too, and lifecycle events may be unavailable
             vm_info_cache.invalidate("_all_vms_")
-            
+            vm_info_cache.invalidate("_vnc_ports_")
+
             return {"success": True, "message": f"VM {vm_name} started successfully"}
         except libvirt.libvirtError as e:
+            if e.get_error_code() == libvirt.VIR_ERR_OPERATION_INVALID:
+                return {"success": False, "error": "VM is already running"}
+            _domain_handles.pop(vm_name, None)
             return {"success": False, "error": f"Failed to start VM: {str(e)}"}
 
 @timing_decorator
-async def stop_vm(vm_name: str, force: bool = False) -> Dict:
-    """Stop a virtual machine"""
+async def stop_vm(vm_name: str = None, force: bool = False, uuid: str = None) -> Dict:
+    """Stop a virtual machine by name or UUID"""
     async with connection_pool.get_connection() as conn:
         try:
-            domain = conn.lookupByName(vm_name)
-            if not domain.isActive():
-                return {"success": False, "error": "VM is not running"}
-            
+            action = (lambda d: d.destroy()) if force else (lambda d: d.shutdown())
+            vm_name = await _act_on_domain(conn, vm_name, uuid, action)
+
+            vm_info_cache.invalidate(vm_name)
+            # The VM's VNC port goes away with it; don't rely on the
+            # (possibly unavailable) lifecycle events to notice
+            vm_info_cache.invalidate("_vnc_ports_")
             if force:
-                domain.destroy()
+                # destroy is immediate and every affected field of a
+                # shutoff domain is deterministic (bulk stats report no
+                # balloon/vcpu groups for inactive domains), so the
+                # cached list can be patched in place; a graceful
+                # shutdown completes later, so that path refills
+                if not vm_info_cache.patch("_all_vms_",
+                                           lambda v: v["name"] == vm_name,
+                                           lambda v: v.update(state="shutoff", id=-1,
+                                                             memory=None, vcpus=None)):
+                    vm_info_cache.invalidate("_all_vms_")
             else:
-                domain.shutdown()
-            
-            vm_info_cache.invalidate(vm_name)
-            vm_info_cache.invalidate("_all_vms_")
-            
+                vm_info_cache.invalidate("_all_vms_")
+
             return {"success": True, "message": f"VM {vm_name} {'destroyed' if force else 'shutdown'} successfully"}
         except libvirt.libvirtError as e:
+            if e.get_error_code() == libvirt.VIR_ERR_OPERATION_INVALID:
+                return {"success": False, "error": "VM is not running"}
+            _domain_handles.pop(vm_name, None)
             return {"success": False, "error": f"Failed to stop VM: {str(e)}"}
 
 @timing_decorator
-async def reboot_vm(vm_name: str) -> Dict:
-    """Reboot a virtual machine"""
+async def reboot_vm(vm_name: str = None, uuid: str = None) -> Dict:
+    """Reboot a virtual machine by name or UUID"""
     async with connection_pool.get_connection() as conn:
         try:
-            domain = conn.lookupByName(vm_name)
-            if not domain.isActive():
-                return {"success": False, "error": "VM is not running"}
-            
-            domain.reboot()
+            vm_name = await _act_on_domain(conn, vm_name, uuid, lambda d: d.reboot())
+            # A rebooting VM stays "running", so the cached list is
+            # still accurate; only the per-VM details are dropped
             vm_info_cache.invalidate(vm_name)
-            vm_info_cache.invalidate("_all_vms_")
-            
+
             return {"success": True, "message": f"VM {vm_name} rebooted successfully"}
         except libvirt.libvirtError as e:
+            if e.get_error_code() == libvirt.VIR_ERR_OPERATION_INVALID:
+                return {"success": False, "error": "VM is not running"}
+            _domain_handles.pop(vm_name, None)
             return {"success": False, "error": f"Failed to reboot VM: {str(e)}"}
 
+def _collect_vnc_ports(conn) -> Dict:
+    """Read VNC ports from the live XML of every active domain.
+
+    One XMLDesc call per running VM over the pooled connection instead
+    of a virsh fork+exec (and its own libvirt connect) per VM.
+    """
+    ports = {}
+    for domain in conn.listAllDomains(libvirt.VIR_CONNECT_LIST_DOMAINS_ACTIVE):
+        try:
+            graphics = ET.fromstring(domain.XMLDesc(0)).find("./devices/graphics[@type='vnc']")
+            if graphics is None:
+                continue
+            port = int(graphics.get("port", -1))
+            if port > 0:  # -1 means autoport not yet assigned
+                ports[domain.name()] = port
+        except (libvirt.libvirtError, ET.ParseError, ValueError) as e:
+            logger.error(f"Error getting VNC port for domain {domain.name()}: {str(e)}")
+    return ports
+
+@timing_decorator
+async def get_vnc_ports(use_cache: bool = True) -> Dict:
+    """Get the VNC ports of all running virtual machines"""
+    if use_cache:
+        cached_ports = vm_info_cache.get("_vnc_ports_")
+        if cached_ports is not None:
+            logger.debug("Returning cached VNC ports")
+            return {"status": "success", "vnc_ports": cached_ports}
+
+    try:
+        async with connection_pool.get_connection() as conn:
+            ports = await asyncio.to_thread(_collect_vnc_ports, conn)
+    except libvirt.libvirtError as e:
+        return {"status": "error", "message": f"Failed to get VNC ports: {str(e)}"}
+
+    if use_cache:
+        vm_info_cache.set("_vnc_ports_", ports)
+    return {"status": "success", "vnc_ports": ports}
+
 def get_vm_ip(domain) -> Optional[str]:
-    """Get the IP address of a VM using virsh domifaddr"""
+    """Get the IPv4 address of a VM from its DHCP leases"""
     try:
-        cmd = ["virsh", "domifaddr", domain.name()]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"Failed to get VM IP: {result.stderr}")
-            return None
-        
-        # Parse the output to find the IP address
-        lines = result.stdout.strip().split('\n')
-        if len(lines) < 3:  # Need at least header + separator + data
-            return None
-        
-        for line in lines[2:]:  # Skip header and separator
-            parts = line.split()
-            if len(parts) >= 4:
-                ip = parts[3].split('/')[0]  # Remove CIDR notation if present
-                return ip
-        
+        interfaces = domain.interfaceAddresses(libvirt.VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_LEASE)
+        for interface in (interfaces or {}).values():
+            for addr in interface.get('addrs', []):
+                if addr.get('type') == libvirt.VIR_IP_ADDR_TYPE_IPV4:
+                    return addr.get('addr')
         return None
     except Exception as e:
         logger.error(f"Error getting VM IP: {str(e)}")
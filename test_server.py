@@ -1,42 +1,30 @@
+import asyncio
 import json
-import subprocess
-import sys
+
+from kvm_mcp.server import handle_request
 
 def send_request(method, params):
+    """Dispatch a JSON-RPC request to the in-process handler.
+
+    Importing the server once and calling handle_request directly skips
+    the interpreter + libvirt import startup a subprocess per request
+    would pay.
+    """
     request = {
         "jsonrpc": "2.0",
         "method": method,
         "params": params,
         "id": 1
     }
-    
-    # Start the server process
-    server = subprocess.Popen(
-        ["python3", "kvm_mcp_server.py"],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    # Send the request
-    server.stdin.write(json.dumps(request) + "\n")
-    server.stdin.flush()
-    
-    # Get the response
-    response = server.stdout.readline()
-    
-    # Clean up
-    server.terminate()
-    server.wait()
-    
+
+    response = asyncio.run(handle_request(json.dumps(request).encode()))
     return json.loads(response)
 
 if __name__ == "__main__":
     # Test list_vms
     print("Testing list_vms...")
     response = send_request("tools/call", {
-        "name": "handle_list_vms",
+        "name": "list_vms",
         "arguments": {}
     })
-    print(json.dumps(response, indent=2)) 
\ No newline at end of file
+    print(json.dumps(response, indent=2))
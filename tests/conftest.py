@@ -11,6 +11,20 @@ pytest_plugins = ["pytest_asyncio"]
 project_root = Path(__file__).parent.parent
 os.environ["PYTHONPATH"] = str(project_root)
 
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """Reset process-wide caches so tests don't see each other's state"""
+    from kvm_mcp.config.config import _parse_config_file
+    from kvm_mcp.cache.vm_cache import vm_info_cache
+    from kvm_mcp.vm.management import _domain_handles
+    from kvm_mcp.vm.ignition import _read_ssh_key_cached, _render_ignition
+    _parse_config_file.cache_clear()
+    vm_info_cache.invalidate()
+    _domain_handles.clear()
+    _read_ssh_key_cached.cache_clear()
+    _render_ignition.cache_clear()
+    yield
+
 @pytest.fixture(scope="session")
 def test_config():
     """Fixture to provide test configuration"""
@@ -0,0 +1,56 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from kvm_mcp.vm.creation import create_vms
+
+@pytest.mark.asyncio
+async def test_create_vms_success():
+    """Test batch creation where every spec succeeds"""
+    specs = [{"name": "vm1"}, {"name": "vm2"}]
+
+    with patch('kvm_mcp.vm.creation.create_vm',
+               AsyncMock(return_value={"status": "success", "message": "created"})) as mock_create:
+        result = await create_vms(specs)
+
+    assert result["status"] == "success"
+    assert [r["name"] for r in result["results"]] == ["vm1", "vm2"]
+    assert all(r["status"] == "success" for r in result["results"])
+    assert mock_create.await_count == 2
+
+@pytest.mark.asyncio
+async def test_create_vms_partial_failure():
+    """Test that one failing spec doesn't abort the rest"""
+    async def fake_create(spec):
+        if spec["name"] == "bad":
+            return {"status": "error", "message": "disk exists"}
+        return {"status": "success", "message": "created"}
+
+    with patch('kvm_mcp.vm.creation.create_vm', side_effect=fake_create):
+        result = await create_vms([{"name": "good"}, {"name": "bad"}])
+
+    assert result["status"] == "partial"
+    assert result["results"][0]["status"] == "success"
+    assert result["results"][1]["status"] == "error"
+
+@pytest.mark.asyncio
+async def test_create_vms_exception_becomes_error_result():
+    """Test that an exception from one spec is reported, not raised"""
+    with patch('kvm_mcp.vm.creation.create_vm',
+               AsyncMock(side_effect=RuntimeError("boom"))):
+        result = await create_vms([{"name": "vm1"}])
+
+    assert result["status"] == "partial"
+    assert result["results"][0] == {"name": "vm1", "status": "error", "message": "boom"}
+
+@pytest.mark.asyncio
+async def test_create_vms_rejects_bad_specs():
+    """Test validation of the specs argument"""
+    assert (await create_vms([]))["status"] == "error"
+    assert (await create_vms("not-a-list"))["status"] == "error"
+
+@pytest.mark.asyncio
+async def test_create_vms_rejects_bad_parallelism():
+    """Test that invalid parallelism values are rejected up front"""
+    for parallelism in (0, -3, "4", None):
+        result = await create_vms([{"name": "vm1"}], parallelism=parallelism)
+        assert result["status"] == "error"
+        assert "parallelism" in result["message"]
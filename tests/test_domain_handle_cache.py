@@ -0,0 +1,93 @@
+import pytest
+import libvirt
+from contextlib import asynccontextmanager
+from unittest.mock import patch, MagicMock
+from kvm_mcp.vm import management
+from kvm_mcp.vm.management import start_vm, forget_domain_handle
+
+def _mock_pool(conn):
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def get_connection():
+        yield conn
+
+    pool.get_connection = get_connection
+    return pool
+
+def _op_invalid_error():
+    error = libvirt.libvirtError("operation invalid")
+    # get_error_code reads the stored virError tuple
+    error.err = (libvirt.VIR_ERR_OPERATION_INVALID, 0, "operation invalid",
+                 None, None, None, None, None, None)
+    return error
+
+@pytest.mark.asyncio
+async def test_start_vm_reuses_cached_handle():
+    """Test that repeated actions on a VM look its handle up only once"""
+    conn = MagicMock()
+    domain = MagicMock()
+    conn.lookupByName.return_value = domain
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        assert (await start_vm("test-vm"))["success"]
+        assert (await start_vm("test-vm"))["success"]
+
+    conn.lookupByName.assert_called_once_with("test-vm")
+    assert management._domain_handles["test-vm"] is domain
+
+@pytest.mark.asyncio
+async def test_stale_handle_retries_with_fresh_lookup():
+    """Test that a stale cached handle heals transparently"""
+    stale = MagicMock()
+    stale.create.side_effect = libvirt.libvirtError("connection closed")
+    fresh = MagicMock()
+    conn = MagicMock()
+    conn.lookupByName.return_value = fresh
+    management._domain_handles["test-vm"] = stale
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await start_vm("test-vm")
+
+    assert result["success"]
+    fresh.create.assert_called_once()
+    assert management._domain_handles["test-vm"] is fresh
+
+@pytest.mark.asyncio
+async def test_operation_invalid_not_retried():
+    """Test that an invalid transition maps to the error without a retry"""
+    domain = MagicMock()
+    domain.create.side_effect = _op_invalid_error()
+    conn = MagicMock()
+    conn.lookupByName.return_value = domain
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await start_vm("test-vm")
+
+    assert result == {"success": False, "error": "VM is already running"}
+    conn.lookupByName.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_retry_failure_surfaces_error_and_drops_handle():
+    """Test that a failing retry still reports the error"""
+    stale = MagicMock()
+    stale.create.side_effect = libvirt.libvirtError("connection closed")
+    fresh = MagicMock()
+    fresh.create.side_effect = libvirt.libvirtError("still broken")
+    conn = MagicMock()
+    conn.lookupByName.return_value = fresh
+    management._domain_handles["test-vm"] = stale
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await start_vm("test-vm")
+
+    assert result["success"] is False
+    assert "Failed to start VM" in result["error"]
+    assert "test-vm" not in management._domain_handles
+
+def test_forget_domain_handle():
+    """Test dropping cached handles, including missing ones"""
+    management._domain_handles["test-vm"] = MagicMock()
+    forget_domain_handle("test-vm")
+    assert "test-vm" not in management._domain_handles
+    forget_domain_handle("never-cached")  # must not raise
@@ -2,7 +2,7 @@ import pytest
 import asyncio
 import libvirt
 from unittest.mock import patch, MagicMock
-from kvm_mcp_server import LibvirtConnectionPool
+from kvm_mcp.connection.pool import LibvirtConnectionPool
 
 @pytest.mark.asyncio
 async def test_connection_pool_initialization():
@@ -12,6 +12,7 @@ async def test_connection_pool_initialization():
         mock_open.return_value = mock_conn
         
         pool = LibvirtConnectionPool(max_connections=2)
+        await pool.initialize()
         assert pool.active_connections == 2
         assert pool.connections.qsize() == 2
         assert mock_open.call_count == 2
@@ -24,6 +25,7 @@ async def test_connection_pool_get_connection():
         mock_open.return_value = mock_conn
         
         pool = LibvirtConnectionPool(max_connections=1)
+        await pool.initialize()
         async with pool.get_connection() as conn:
             assert conn == mock_conn
             assert pool.active_connections == 1
@@ -36,6 +38,7 @@ async def test_connection_pool_timeout():
         mock_open.return_value = mock_conn
         
         pool = LibvirtConnectionPool(max_connections=1, timeout=0.1)
+        await pool.initialize()
         # Get first connection
         async with pool.get_connection():
             # Try to get another connection (should timeout and create new one)
@@ -52,12 +55,40 @@ async def test_connection_pool_dead_connection():
         mock_open.return_value = mock_conn
         
         pool = LibvirtConnectionPool(max_connections=1)
+        await pool.initialize()
+        # Backdate the liveness bookkeeping so the return path probes
+        pooled = pool.connections.get_nowait()
+        pooled.last_checked -= pool.LIVENESS_CHECK_INTERVAL + 1
+        pool.connections.put_nowait(pooled)
+
         async with pool.get_connection():
             pass  # Connection will be detected as dead and replaced
-        
+
+        # Return/replace runs as a background maintenance task
+        if pool._maintenance:
+            await asyncio.gather(*pool._maintenance)
+
         assert pool.active_connections == 1
         assert mock_open.call_count == 2
 
+@pytest.mark.asyncio
+async def test_connection_pool_lazy_liveness_check():
+    """Test that a recently verified connection skips the liveness probe"""
+    with patch('libvirt.open') as mock_open:
+        mock_conn = MagicMock()
+        mock_open.return_value = mock_conn
+
+        pool = LibvirtConnectionPool(max_connections=1)
+        await pool.initialize()
+        async with pool.get_connection():
+            pass
+        if pool._maintenance:
+            await asyncio.gather(*pool._maintenance)
+
+        # Fresh connection goes straight back without a getVersion RPC
+        mock_conn.getVersion.assert_not_called()
+        assert pool.connections.qsize() == 1
+
 @pytest.mark.asyncio
 async def test_connection_pool_close_all():
     """Test closing all connections in the pool"""
@@ -66,6 +97,7 @@ async def test_connection_pool_close_all():
         mock_open.return_value = mock_conn
         
         pool = LibvirtConnectionPool(max_connections=2)
+        await pool.initialize()
         await pool.close_all()
         assert pool.active_connections == 0
         assert pool.connections.empty()
@@ -77,7 +109,8 @@ async def test_connection_pool_error_handling():
         mock_open.side_effect = libvirt.libvirtError("Connection failed")
         
         # Test initialization with errors
-        pool = LibvirtConnectionPool(max_connections=2)
+        pool = LibvirtConnectionPool(max_connections=2, timeout=0.1)
+        await pool.initialize()
         assert pool.active_connections == 0
         
         # Test connection retrieval with errors
@@ -1,6 +1,6 @@
 import pytest
 import time
-from kvm_mcp_server import VMInfoCache
+from kvm_mcp.cache.vm_cache import VMInfoCache
 
 def test_vm_info_cache_initialization():
     """Test the initialization of the VM info cache"""
@@ -8,7 +8,6 @@ def test_vm_info_cache_initialization():
     assert cache.max_size == 10
     assert cache.ttl == 30
     assert len(cache.cache) == 0
-    assert len(cache.timestamps) == 0
 
 def test_vm_info_cache_set_get():
     """Test setting and getting VM info from the cache"""
@@ -48,6 +47,37 @@ def test_vm_info_cache_max_size():
     assert cache.get("vm2") is not None
     assert cache.get("vm3") is not None
 
+def test_vm_info_cache_lru_recency():
+    """Test that a recently accessed entry survives eviction"""
+    cache = VMInfoCache(max_size=2)
+
+    cache.set("vm1", {"name": "vm1"})
+    cache.set("vm2", {"name": "vm2"})
+
+    # Touch vm1 so vm2 becomes the least recently used entry
+    assert cache.get("vm1") is not None
+    cache.set("vm3", {"name": "vm3"})
+
+    assert cache.get("vm1") is not None
+    assert cache.get("vm2") is None
+    assert cache.get("vm3") is not None
+
+def test_vm_info_cache_frequency_protects_hot_keys():
+    """Test that a frequently accessed entry survives one-off lookups"""
+    cache = VMInfoCache(max_size=3)
+
+    cache.set("hot", {"name": "hot"})
+    for _ in range(5):
+        assert cache.get("hot") is not None
+
+    # Fill the cache and push one more entry in; the hot key should
+    # outlive the cold ones even though it is among the oldest
+    cache.set("cold1", {"name": "cold1"})
+    cache.set("cold2", {"name": "cold2"})
+    cache.set("cold3", {"name": "cold3"})
+
+    assert cache.get("hot") is not None
+
 def test_vm_info_cache_invalidate():
     """Test cache invalidation"""
     cache = VMInfoCache()
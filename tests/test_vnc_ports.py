@@ -1,124 +1,101 @@
 import pytest
+import libvirt
+from contextlib import asynccontextmanager
 from unittest.mock import patch, MagicMock
-from kvm_mcp_server import get_vnc_ports
+from kvm_mcp.vm.management import get_vnc_ports
+
+def _mock_domain(name, xml):
+    domain = MagicMock()
+    domain.name.return_value = name
+    domain.XMLDesc.return_value = xml
+    return domain
+
+def _vnc_xml(port):
+    return f"""<domain type='kvm'>
+  <devices>
+    <graphics type='vnc' port='{port}' listen='0.0.0.0'/>
+  </devices>
+</domain>"""
+
+def _mock_pool(conn):
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def get_connection():
+        yield conn
+
+    pool.get_connection = get_connection
+    return pool
 
 @pytest.mark.asyncio
 async def test_get_vnc_ports_success():
     """Test successful retrieval of VNC ports"""
-    # Mock data
-    running_vms = "ansible\nn8n\nterry\n"
-    vnc_displays = {
-        "ansible": ":0\n",  # Should map to port 5900
-        "n8n": ":1\n",      # Should map to port 5901
-        "terry": ":2\n"     # Should map to port 5902
-    }
-
-    # Create mock subprocess run function
-    def mock_subprocess_run(args, **kwargs):
-        mock_result = MagicMock()
-        if args[0] == 'virsh' and args[1] == '-c' and args[2] == 'qemu:///system' and args[3] == 'list':
-            mock_result.returncode = 0
-            mock_result.stdout = running_vms
-        elif args[0] == 'virsh' and args[1] == '-c' and args[2] == 'qemu:///system' and args[3] == 'vncdisplay':
-            vm_name = args[4]
-            mock_result.returncode = 0
-            mock_result.stdout = vnc_displays.get(vm_name, '')
-        return mock_result
-
-    # Patch subprocess.run
-    with patch('subprocess.run', side_effect=mock_subprocess_run):
-        result = await get_vnc_ports("get_vnc_ports", {})
-        
+    conn = MagicMock()
+    conn.listAllDomains.return_value = [
+        _mock_domain("ansible", _vnc_xml(5900)),
+        _mock_domain("n8n", _vnc_xml(5901)),
+        _mock_domain("terry", _vnc_xml(5902)),
+    ]
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await get_vnc_ports()
+
         assert result["status"] == "success"
-        assert "vnc_ports" in result
-        assert result["vnc_ports"]["ansible"] == 5900
-        assert result["vnc_ports"]["n8n"] == 5901
-        assert result["vnc_ports"]["terry"] == 5902
+        assert result["vnc_ports"] == {"ansible": 5900, "n8n": 5901, "terry": 5902}
 
 @pytest.mark.asyncio
 async def test_get_vnc_ports_no_vms():
     """Test VNC port retrieval when no VMs are running"""
-    def mock_subprocess_run(args, **kwargs):
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "\n"  # Empty list of VMs
-        return mock_result
-
-    with patch('subprocess.run', side_effect=mock_subprocess_run):
-        result = await get_vnc_ports("get_vnc_ports", {})
-        
+    conn = MagicMock()
+    conn.listAllDomains.return_value = []
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await get_vnc_ports()
+
         assert result["status"] == "success"
-        assert "vnc_ports" in result
-        assert len(result["vnc_ports"]) == 0
+        assert result["vnc_ports"] == {}
 
 @pytest.mark.asyncio
-async def test_get_vnc_ports_virsh_error():
-    """Test error handling when virsh command fails"""
-    def mock_subprocess_run(args, **kwargs):
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stderr = "Failed to connect to hypervisor"
-        return mock_result
-
-    with patch('subprocess.run', side_effect=mock_subprocess_run):
-        result = await get_vnc_ports("get_vnc_ports", {})
-        
-        assert result["status"] == "error"
-        assert "Failed to get VM list" in result["message"]
+async def test_get_vnc_ports_skips_unassigned_port():
+    """Test that domains without an assigned VNC port are skipped"""
+    conn = MagicMock()
+    conn.listAllDomains.return_value = [
+        _mock_domain("test-vm1", _vnc_xml(5901)),
+        _mock_domain("test-vm2", _vnc_xml(-1)),  # autoport, not yet assigned
+    ]
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await get_vnc_ports()
 
-@pytest.mark.asyncio
-async def test_get_vnc_ports_invalid_display():
-    """Test handling of invalid VNC display numbers"""
-    # Mock data with an invalid display number
-    running_vms = "test-vm1\ntest-vm2\n"
-    vnc_displays = {
-        "test-vm1": ":1\n",      # Valid display
-        "test-vm2": "invalid\n"  # Invalid display
-    }
-
-    def mock_subprocess_run(args, **kwargs):
-        mock_result = MagicMock()
-        if args[0] == 'virsh' and args[1] == '-c' and args[2] == 'qemu:///system' and args[3] == 'list':
-            mock_result.returncode = 0
-            mock_result.stdout = running_vms
-        elif args[0] == 'virsh' and args[1] == '-c' and args[2] == 'qemu:///system' and args[3] == 'vncdisplay':
-            vm_name = args[4]
-            mock_result.returncode = 0
-            mock_result.stdout = vnc_displays.get(vm_name, '')
-        return mock_result
-
-    with patch('subprocess.run', side_effect=mock_subprocess_run):
-        result = await get_vnc_ports("get_vnc_ports", {})
-        
         assert result["status"] == "success"
-        assert "vnc_ports" in result
-        assert result["vnc_ports"]["test-vm1"] == 5901
-        assert "test-vm2" not in result["vnc_ports"]  # Invalid display should be skipped
+        assert result["vnc_ports"] == {"test-vm1": 5901}
 
 @pytest.mark.asyncio
-async def test_get_vnc_ports_out_of_range_display():
-    """Test handling of out-of-range VNC display numbers"""
-    running_vms = "test-vm1\ntest-vm2\n"
-    vnc_displays = {
-        "test-vm1": ":1\n",      # Valid display
-        "test-vm2": ":100\n"     # Out of range display
-    }
-
-    def mock_subprocess_run(args, **kwargs):
-        mock_result = MagicMock()
-        if args[0] == 'virsh' and args[1] == '-c' and args[2] == 'qemu:///system' and args[3] == 'list':
-            mock_result.returncode = 0
-            mock_result.stdout = running_vms
-        elif args[0] == 'virsh' and args[1] == '-c' and args[2] == 'qemu:///system' and args[3] == 'vncdisplay':
-            vm_name = args[4]
-            mock_result.returncode = 0
-            mock_result.stdout = vnc_displays.get(vm_name, '')
-        return mock_result
-
-    with patch('subprocess.run', side_effect=mock_subprocess_run):
-        result = await get_vnc_ports("get_vnc_ports", {})
-        
+async def test_get_vnc_ports_skips_non_vnc_graphics():
+    """Test that domains without VNC graphics are skipped"""
+    conn = MagicMock()
+    conn.listAllDomains.return_value = [
+        _mock_domain("spice-vm", """<domain type='kvm'>
+  <devices>
+    <graphics type='spice' port='5930'/>
+  </devices>
+</domain>"""),
+    ]
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await get_vnc_ports()
+
         assert result["status"] == "success"
-        assert "vnc_ports" in result
-        assert result["vnc_ports"]["test-vm1"] == 5901
-        assert "test-vm2" not in result["vnc_ports"]  # Out of range display should be skipped 
\ No newline at end of file
+        assert result["vnc_ports"] == {}
+
+@pytest.mark.asyncio
+async def test_get_vnc_ports_libvirt_error():
+    """Test error handling when the libvirt call fails"""
+    conn = MagicMock()
+    conn.listAllDomains.side_effect = libvirt.libvirtError("Failed to connect to hypervisor")
+
+    with patch('kvm_mcp.vm.management.connection_pool', _mock_pool(conn)):
+        result = await get_vnc_ports()
+
+        assert result["status"] == "error"
+        assert "Failed to get VNC ports" in result["message"]